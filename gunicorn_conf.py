@@ -0,0 +1,27 @@
+# ============================================================================
+# gunicorn_conf.py — Configuración Gunicorn (API Flask Breast Cancer)
+# Autor: John Gómez
+# Descripción:
+#   Arranque de producción con varios workers sync y la app precargada.
+#   Con preload_app el artefacto joblib se carga una sola vez en el proceso
+#   maestro y los workers lo heredan por fork (copy-on-write), en lugar de
+#   que cada worker repita joblib.load al iniciar.
+#
+# Uso:
+#   gunicorn -c gunicorn_conf.py 'src.app:create_app()'
+#
+# Variables de entorno:
+#   - PORT             → puerto de escucha (por defecto 5000)
+#   - WEB_CONCURRENCY  → número de workers (por defecto max(2, nº de CPUs))
+# ============================================================================
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", max(2, os.cpu_count() or 1)))
+worker_class = "sync"
+preload_app = True
+
+# Reciclado periódico de workers (con jitter para que no reinicien a la vez)
+max_requests = 1000
+max_requests_jitter = 50
@@ -10,29 +10,89 @@
 #   - GET  /          → info del servicio
 #   - GET  /health    → estado del modelo
 #   - POST /predict   → predicción a partir de 30 características
+#                       ({"features": [...]}) o de varias filas a la vez
+#                       ({"features_batch": [[...], ...]}, hasta PREDICT_MAX_ROWS)
 #   - GET  /metrics   → métricas Prometheus (latencia, conteos)
 #
+# Micro-batching (opcional):
+#   BATCHING=1 agrupa peticiones concurrentes de /predict en una sola llamada
+#   a predict_proba(X_batch). Útil con workers con hilos (p.ej. gthread);
+#   con workers sync cada proceso atiende 1 request a la vez y no hay qué agrupar.
+#   - BATCH_SIZE        → máximo de filas por llamada al modelo (default 25);
+#                         un features_batch más grande va solo en su llamada
+#   - BATCH_TIMEOUT_MS  → ventana de espera para completar el batch (default 10)
+#   - BATCH_SLO_MS      → tiempo máximo que una petición espera su resultado (default 1000)
+#
+# Modelo ONNX (opcional):
+#   Si MODEL_PATH termina en .onnx se sirve con onnxruntime (requiere
+#   onnxruntime instalado). El .onnx lo genera train_breast_cancer.py.
+#
+# Modelo Treelite (opcional):
+#   Si MODEL_PATH termina en .so se usa el RF compilado con TL2cgen (requiere
+#   tl2cgen) y <modelo>.meta.json (meta + serving); el escalado se hace en la API.
+#   Se genera con: EXPORT_TREELITE=1 python src/train_breast_cancer.py
+#
+# Escalado (Numba opcional):
+#   Si el modelo es un Pipeline StandardScaler + clasificador, el escalado se
+#   hace fuera de sklearn con scale_rows (compilada con Numba si está
+#   instalado; si no, NumPy).
+#
+# Fast path (opcional):
+#   FAST_PATH=1 sirve la LogisticRegression destilada del RF (lr_coef /
+#   lr_intercept en los parámetros de serving del artefacto, no en la meta):
+#   un producto punto de 30 floats por fila.
+#   Una fracción FAST_PATH_AUDIT_RATE (default 0.05) de las filas se compara
+#   en segundo plano con el modelo completo (métrica api_fast_path_audit_total
+#   y log periódico de la tasa de acuerdo).
+#   Si junto al modelo existe el kernel AOT bc_kernels.*.so (EXPORT_AOT=1 al
+#   entrenar), el fast path (score_rows) y el escalado del modelo completo
+#   (scale_rows) lo usan: no se compila nada con Numba al arrancar.
+#
+# Caché de predicciones:
+#   /predict guarda (índice, proba) por vector de features redondeado a 5
+#   decimales en un LRU de PREDICT_CACHE_SIZE entradas (default 1024; 0 la
+#   desactiva). REQ_COUNT lleva el label cache_hit.
+#
+# Warmup:
+#   WARMUP=1 (default) hace una predicción de prueba al crear la app para
+#   pagar la inicialización perezosa (JIT, sesiones, imports) antes del
+#   primer request real. WARMUP=0 la desactiva.
+#
+# Validación:
+#   Por defecto /predict valida el vector de 30 floats a mano (sin construir
+#   un BaseModel por request). STRICT_VALIDATION=1 usa el esquema Pydantic.
+#
 # Uso local (dev):
 #   export PORT=5000 MODEL_PATH=src/model/modelo_breast.pkl
-#   python -m flask --app src.app:app run  # si defines app global
-#   # o:
-#   python src/app.py                       # ejecutable directo (create_app)
+#   FLASK_ENV=development python src/app.py   # servidor de desarrollo Werkzeug
 #
-# Producción (Gunicorn):
-#   gunicorn -w 2 -b 0.0.0.0:${PORT} 'src.app:create_app()'
+# Producción (Gunicorn, app precargada; ver gunicorn_conf.py):
+#   gunicorn -c gunicorn_conf.py 'src.app:create_app()'
 # ============================================================================
 
 from __future__ import annotations
-import os, json, time, uuid, logging
-from typing import List, Optional, Annotated
+import os, glob, json, time, random, secrets, logging, queue, threading
+import importlib.machinery, importlib.util
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Annotated
 
 import joblib
 import numpy as np
-from flask import Flask, request, jsonify, g, Response
+import orjson
+from flask import Flask, request, g, Response
 from flask_cors import CORS
 from flask import has_request_context, g
 from pydantic import BaseModel, Field, ValidationError
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Numba es opcional: sin él scale_rows usa NumPy
+try:
+    from numba import njit
+except Exception:  # pragma: no cover
+    njit = None
 
 
 # -------- Config por entorno (con defaults seguros para local) --------
@@ -45,29 +105,299 @@ ARTIFACT_PATH = os.getenv("MODEL_PATH", "src/model/modelo_breast.pkl")
 REQ_COUNT = Counter(
     "api_requests_total",
     "Total de requests",
-    ["endpoint", "method", "status"]
+    ["endpoint", "method", "status", "cache_hit"]
 )
 REQ_LATENCY = Histogram(
     "api_request_latency_seconds",
     "Latencia por endpoint",
     ["endpoint", "method"]
 )
+BATCH_SIZE_HIST = Histogram(
+    "api_predict_batch_size",
+    "Filas por llamada al modelo (micro-batching)",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+FAST_PATH_AUDIT = Counter(
+    "api_fast_path_audit_total",
+    "Filas del fast path comparadas con el modelo completo",
+    ["agree"]
+)
+
+# Hijos de REQ_COUNT / REQ_LATENCY ya resueltos por combinación de labels:
+# evita el lookup (con lock) de .labels() en cada request.
+_METRIC_CHILDREN: Dict[Tuple[str, str, str, str], Tuple[Any, Any]] = {}
+
+def _metric_children(endpoint: str, method: str, status: str, cache_hit: str):
+    key = (endpoint, method, status, cache_hit)
+    children = _METRIC_CHILDREN.get(key)
+    if children is None:
+        children = _METRIC_CHILDREN[key] = (
+            REQ_COUNT.labels(endpoint, method, status, cache_hit),
+            REQ_LATENCY.labels(endpoint, method),
+        )
+    return children
+
+# ======== Config validación ========
+N_FEATURES = 30
+STRICT_VALIDATION = os.getenv("STRICT_VALIDATION", "0") == "1"
+PREDICT_MAX_ROWS = int(os.getenv("PREDICT_MAX_ROWS", 256))
+WARMUP = os.getenv("WARMUP", "1") == "1"
+
+# ======== Config fast path ========
+FAST_PATH = os.getenv("FAST_PATH", "0") == "1"
+FAST_PATH_AUDIT_RATE = float(os.getenv("FAST_PATH_AUDIT_RATE", 0.05))
+
+# ======== Config caché de predicciones ========
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", 1024))
+PREDICT_CACHE_DECIMALS = 5
+
+# ======== Config micro-batching ========
+BATCHING = os.getenv("BATCHING", "0") == "1"
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", 25))
+BATCH_TIMEOUT_MS = float(os.getenv("BATCH_TIMEOUT_MS", 10))
+BATCH_SLO_MS = float(os.getenv("BATCH_SLO_MS", 1000))
 
 # ======== Esquema de entrada con Pydantic (v2) ========
 class PredictInput(BaseModel):
     # Lista de 30 floats exactos
-    features: Annotated[List[float], Field(min_length=30, max_length=30)]
+    features: Annotated[List[float], Field(min_length=N_FEATURES, max_length=N_FEATURES)]
+
+# Batch explícito: {"features_batch": [[30 floats], ...]}
+class PredictBatchInput(BaseModel):
+    features_batch: Annotated[
+        List[Annotated[List[float], Field(min_length=N_FEATURES, max_length=N_FEATURES)]],
+        Field(min_length=1, max_length=PREDICT_MAX_ROWS)
+    ]
+
+# ======== Validación manual (hot path) ========
+class BadPayload(ValueError):
+    """Payload inválido; errors() sigue el formato de ValidationError de Pydantic."""
+    def __init__(self, error_type: str, msg: str, loc: tuple = ("features",)):
+        super().__init__(msg)
+        self._errors = [{"type": error_type, "loc": list(loc), "msg": msg}]
+
+    def errors(self):
+        return self._errors
+
+# Buffer (1, 30) por hilo, reutilizado entre requests para no asignar un
+# array nuevo en cada /predict. Se mantiene en float64: el RandomForest ya
+# convierte a float32 internamente tras el StandardScaler, y escalar en
+# float32 cambia algunas predicciones frente al modelo entrenado.
+_TLS = threading.local()
+
+def _row_buffer() -> np.ndarray:
+    buf = getattr(_TLS, "buf", None)
+    if buf is None:
+        buf = _TLS.buf = np.empty((1, N_FEATURES), dtype=np.float64)
+    return buf
+
+def _fill_row(X: np.ndarray, i: int, features, loc: tuple):
+    """Valida una lista de 30 floats y la copia en X[i]."""
+    if not isinstance(features, list):
+        raise BadPayload("list_type", "Input should be a valid list", loc)
+    if len(features) != N_FEATURES:
+        kind = "too_short" if len(features) < N_FEATURES else "too_long"
+        raise BadPayload(kind, f"List should have {N_FEATURES} items, not {len(features)}", loc)
+    try:
+        X[i, :] = features
+    except (TypeError, ValueError):
+        raise BadPayload("float_parsing", "Input should be a valid number", loc)
+    # None se convierte en NaN al asignar: se rechaza igual que en Pydantic
+    if np.isnan(X[i]).any():
+        raise BadPayload("float_parsing", "Input should be a valid number", loc)
+
+def _validate(payload) -> np.ndarray:
+    """
+    Valida {"features": [30 floats]} y devuelve X con shape (1, 30).
+    X es el buffer del hilo actual: se sobrescribe en el siguiente request.
+    """
+    # Cuerpo no-objeto (p.ej. [1]): mismo error 400 en ambos modos
+    if not isinstance(payload, dict):
+        raise BadPayload("model_type", "Input should be a valid dictionary or instance of PredictInput", ())
+    if STRICT_VALIDATION:
+        payload = PredictInput.model_validate(payload).model_dump()
+    elif "features" not in payload:
+        raise BadPayload("missing", "Field required")
+    X = _row_buffer()
+    _fill_row(X, 0, payload["features"], ("features",))
+    return X
+
+def _validate_batch(payload: dict) -> np.ndarray:
+    """Valida {"features_batch": [[30 floats], ...]} y devuelve X (n, 30)."""
+    if STRICT_VALIDATION:
+        payload = PredictBatchInput.model_validate(payload).model_dump()
+    rows = payload["features_batch"]
+    loc = ("features_batch",)
+    if not isinstance(rows, list):
+        raise BadPayload("list_type", "Input should be a valid list", loc)
+    if not 1 <= len(rows) <= PREDICT_MAX_ROWS:
+        kind = "too_short" if not rows else "too_long"
+        raise BadPayload(kind, f"List should have between 1 and {PREDICT_MAX_ROWS} items, not {len(rows)}", loc)
+    X = np.empty((len(rows), N_FEATURES), dtype=np.float64)
+    for i, row in enumerate(rows):
+        _fill_row(X, i, row, ("features_batch", i))
+    return X
+
+# ======== Escalado de features ========
+def _scale_rows_numpy(X: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    return ((X - mean) / scale).astype(np.float32)
+
+if njit is not None:
+    # cache=True guarda la compilación en disco: los workers no repiten el JIT.
+    # Sin fastmath: la división debe coincidir con StandardScaler.transform.
+    @njit(cache=True)
+    def scale_rows(X, mean, scale):
+        n, d = X.shape
+        out = np.empty((n, d), dtype=np.float32)
+        for r in range(n):
+            for i in range(d):
+                out[r, i] = (X[r, i] - mean[i]) / scale[i]
+        return out
+else:
+    scale_rows = _scale_rows_numpy
+
+class ScaledModel:
+    """
+    Pipeline StandardScaler + clasificador con el escalado hecho por
+    scale_rows: evita la validación y los temporales de transform() en
+    cada request. Mismo resultado que el pipeline (el RF compara en float32).
+    scale_fn puede cambiarse por el scale_rows AOT de bc_kernels.
+    """
+    def __init__(self, pipe: Pipeline):
+        scaler = pipe.steps[0][1]
+        self.clf = pipe.steps[-1][1]
+        self.scale_fn = scale_rows
+        self.mean = np.ascontiguousarray(scaler.mean_, dtype=np.float64)
+        self.scale = np.ascontiguousarray(scaler.scale_, dtype=np.float64)
+        self.classes_ = getattr(self.clf, "classes_", None)
+        if hasattr(self.clf, "predict_proba"):
+            self.predict_proba = lambda X: self.clf.predict_proba(self.transform(X))
+
+    @staticmethod
+    def supports(model) -> bool:
+        if not isinstance(model, Pipeline) or len(model.steps) != 2:
+            return False
+        scaler = model.steps[0][1]
+        return isinstance(scaler, StandardScaler) and scaler.with_mean and scaler.with_std
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return self.scale_fn(X, self.mean, self.scale)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.clf.predict(self.transform(X))
 
 # ======== Utilidades de modelo ========
+class OnnxModel:
+    """
+    Envuelve un InferenceSession de onnxruntime con la interfaz sklearn que
+    usa la API (predict_proba, predict, classes_). La meta, los parámetros
+    de serving y las clases se leen de metadata_props del .onnx (ver
+    train_breast_cancer.py).
+    """
+    def __init__(self, path: str):
+        import onnxruntime as ort  # opcional: solo necesario para .onnx
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = 1
+        self.session = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        # Salidas con zipmap=False: (labels, probabilities)
+        self.proba_name = self.session.get_outputs()[1].name
+        props = self.session.get_modelmeta().custom_metadata_map
+        self.meta = json.loads(props.get("meta", "{}"))
+        self.serving = json.loads(props.get("serving", "{}"))
+        self.classes_ = np.array(json.loads(props["classes"])) if "classes" in props else None
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.session.run([self.proba_name], {self.input_name: X.astype(np.float32)})[0]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        idx = self.predict_proba(X).argmax(axis=1)
+        return self.classes_[idx] if self.classes_ is not None else idx
+
+class TreeliteModel:
+    """
+    Envuelve el RF compilado con TL2cgen con la misma interfaz sklearn.
+    La librería no incluye el StandardScaler: se aplica aquí con
+    scaler_mean/scaler_scale de los parámetros de serving (<modelo>.meta.json).
+    """
+    def __init__(self, path: str):
+        import tl2cgen  # opcional: solo necesario para .so
+        self._tl2cgen = tl2cgen
+        self.predictor = tl2cgen.Predictor(path)
+        meta_path = os.path.splitext(path)[0] + ".meta.json"
+        with open(meta_path, encoding="utf-8") as f:
+            sidecar = json.load(f)
+        self.meta = sidecar.get("meta", {})
+        self.serving = sidecar.get("serving", {})
+        self.mean = np.asarray(self.serving["scaler_mean"], dtype=np.float64)
+        self.scale = np.asarray(self.serving["scaler_scale"], dtype=np.float64)
+        self.classes_ = np.array(sidecar["classes"]) if "classes" in sidecar else None
+        self.scale_fn = scale_rows
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        # Escalado en float64 (como el pipeline); el RF compara en float32
+        # (TL2cgen solo acepta entradas float: cuantizar a int16 no ahorraría trabajo)
+        out = self.predictor.predict(self._tl2cgen.DMatrix(self.scale_fn(X, self.mean, self.scale)))
+        return out.reshape(X.shape[0], -1)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        idx = self.predict_proba(X).argmax(axis=1)
+        return self.classes_[idx] if self.classes_ is not None else idx
+
 def load_artifact(path: str):
     """
     Se espera un joblib con un dict:
-      {"model": <clf>, "meta": {"n_features": 30, "class_names": [...]}}
+      {"model": <clf>, "meta": {"n_features": 30, "class_names": [...]},
+       "serving": {"scaler_mean": [...], "lr_coef": [...], ...}}
+    o un .onnx / .so exportado por train_breast_cancer.py.
+    Devuelve (model, meta, serving): meta es pública (/ y /health), serving
+    son los parámetros de las rutas que no usan el pipeline (fast path).
     """
+    if path.endswith(".onnx"):
+        model = OnnxModel(path)
+        return model, model.meta, model.serving
+    if path.endswith(".so"):
+        model = TreeliteModel(path)
+        return model, model.meta, model.serving
+    # Sin mmap_mode: el entrenamiento reescribe el .pkl en el mismo sitio y un
+    # modelo mapeado leería los bytes nuevos. Tampoco ahorraría memoria: los
+    # árboles de sklearn copian sus arrays al deserializarse.
     obj = joblib.load(path)
     model = obj["model"]
     meta = obj.get("meta", {})
-    return model, meta
+    _single_thread_forests(model)
+    return model, meta, obj.get("serving", {})
+
+def _single_thread_forests(model):
+    """
+    Fuerza n_jobs=1 (y verbose=0) en los RandomForest del modelo: para
+    predecir 1 fila, el backend Parallel de joblib cuesta más que recorrer
+    los árboles en el mismo hilo. Da igual con qué n_jobs se entrenó.
+    """
+    steps = [est for _, est in model.steps] if isinstance(model, Pipeline) else [model]
+    for est in steps:
+        if isinstance(est, RandomForestClassifier):
+            est.n_jobs = 1
+            est.verbose = 0
+
+# Cache de artefactos por (ruta, mtime): create_app() repetidos (tests,
+# autoreload, varias apps) no vuelven a deserializar el joblib.
+_ARTIFACT_CACHE: Dict[Tuple[str, float], Tuple[Any, dict, dict]] = {}
+
+def load_artifact_cached(path: str):
+    """
+    Igual que load_artifact, pero reutiliza el (model, meta, serving) ya
+    cargado mientras el archivo no cambie (mismo mtime). Al cambiar el mtime
+    se descarta la entrada anterior de la misma ruta.
+    """
+    path = os.path.abspath(path)
+    key = (path, os.stat(path).st_mtime)
+    cached = _ARTIFACT_CACHE.get(key)
+    if cached is None:
+        for old in [k for k in _ARTIFACT_CACHE if k[0] == path]:
+            del _ARTIFACT_CACHE[old]
+        cached = _ARTIFACT_CACHE[key] = load_artifact(path)
+    return cached
 
 def n_features_expected(meta: dict) -> int:
     try:
@@ -75,6 +405,244 @@ def n_features_expected(meta: dict) -> int:
     except Exception:
         return 30
 
+def predict_rows(model, X: np.ndarray):
+    """
+    Devuelve (pred, proba) para las filas de X recorriendo el modelo una sola vez:
+    pred = classes_[argmax(proba)], igual que predict() en clasificadores sklearn.
+    Si el modelo no expone predict_proba se usa predict() y proba es None.
+    """
+    if not hasattr(model, "predict_proba"):
+        return model.predict(X), None
+    proba = model.predict_proba(X)
+    idx = proba.argmax(axis=1)
+    classes = getattr(model, "classes_", None)
+    return (classes[idx] if classes is not None else idx), proba
+
+# ======== Fast path: LR destilada ========
+def load_aot_kernels(model_dir: str):
+    """
+    Importa bc_kernels (compilado con numba.pycc por train_breast_cancer.py)
+    desde la carpeta del modelo. Solo considera extensiones con un sufijo
+    del intérprete actual (EXTENSION_SUFFIXES). Devuelve None si no existe
+    o no carga; en ese caso el fast path usa Numba JIT / NumPy.
+    """
+    logger = logging.getLogger(__name__)
+    paths = [os.path.join(model_dir, "bc_kernels" + suffix)
+             for suffix in importlib.machinery.EXTENSION_SUFFIXES]
+    paths = [p for p in paths if os.path.isfile(p)]
+    if not paths:
+        others = glob.glob(os.path.join(model_dir, "bc_kernels*.so"))
+        if others:
+            logger.warning(f"bc_kernels ignorado: {', '.join(sorted(others))} no es de este intérprete "
+                           f"({importlib.machinery.EXTENSION_SUFFIXES[0]})")
+        return None
+    try:
+        spec = importlib.util.spec_from_file_location("bc_kernels", paths[0])
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    except Exception as e:
+        logger.warning(f"No se pudo cargar el kernel AOT {paths[0]}: {e}")
+        return None
+
+class DistilledModel:
+    """
+    LogisticRegression destilada del RF (ver train_breast_cancer.py):
+    proba = sigmoid(coef · x_scaled + intercept). Una muestra de las filas se
+    audita en un hilo aparte contra el modelo completo (reference).
+    """
+    def __init__(self, serving: dict, reference, audit_rate: float, kernels=None):
+        self.kernels = kernels  # bc_kernels AOT (opcional)
+        self.mean = np.asarray(serving["scaler_mean"], dtype=np.float64)
+        self.scale = np.asarray(serving["scaler_scale"], dtype=np.float64)
+        self.coef = np.asarray(serving["lr_coef"], dtype=np.float32)
+        self.intercept = np.float32(serving["lr_intercept"])
+        self.classes_ = getattr(reference, "classes_", None)
+        self.reference = reference
+        self.audit_rate = audit_rate
+        self.logger = logging.getLogger(__name__)
+        self._audit_q: Optional[queue.Queue] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._seen = self._agree = 0
+
+    @staticmethod
+    def supports(serving: dict) -> bool:
+        return all(k in serving for k in ("lr_coef", "lr_intercept", "scaler_mean", "scaler_scale"))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        proba = self._score(X)
+        if self.audit_rate > 0 and random.random() < self.audit_rate:
+            self._submit_audit(X.copy(), proba.argmax(axis=1))
+        return proba
+
+    def _score(self, X: np.ndarray) -> np.ndarray:
+        """predict_proba de la LR sin auditoría."""
+        if self.kernels is not None:
+            p = self.kernels.score_rows(X, self.mean, self.scale, self.coef, self.intercept)
+        else:
+            z = scale_rows(X, self.mean, self.scale) @ self.coef + self.intercept
+            p = 1.0 / (1.0 + np.exp(-z))
+        return np.column_stack((1.0 - p, p))
+
+    def _submit_audit(self, X: np.ndarray, idx: np.ndarray):
+        # Mismo esquema que MicroBatcher: el hilo se relanza tras un fork
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    q = queue.Queue(maxsize=1000)
+                    threading.Thread(target=self._audit_run, args=(q,), name="fast-path-audit", daemon=True).start()
+                    self._audit_q, self._pid = q, os.getpid()
+        try:
+            self._audit_q.put_nowait((X, idx))
+        except queue.Full:
+            pass  # auditoría best-effort: nunca frena el request
+
+    def _audit_run(self, q: queue.Queue):
+        while True:
+            X, idx = q.get()
+            try:
+                ref = self.reference.predict_proba(X).argmax(axis=1)
+            except Exception as e:
+                self.logger.warning(f"Auditoría fast path fallida: {e}")
+                continue
+            for agree in (idx == ref):
+                FAST_PATH_AUDIT.labels(str(bool(agree)).lower()).inc()
+                self._seen += 1
+                self._agree += int(agree)
+            if self._seen % 100 < len(idx):
+                self.logger.info(f"Fast path: acuerdo con el modelo completo {self._agree / self._seen:.4f} ({self._seen} filas)")
+
+def warmup_model(model, n_features: int):
+    """
+    Predicción de prueba con una fila de ceros. En el fast path se calientan
+    la LR y el modelo completo por separado: la fila no pasa por la
+    auditoría (ni arranca su hilo antes del fork, ni cuenta en las métricas).
+    """
+    X = np.zeros((1, n_features), dtype=np.float64)
+    if isinstance(model, DistilledModel):
+        model._score(X)
+        model = model.reference
+    predict_rows(model, X)
+
+# ======== Caché de predicciones ========
+class PredictionCache:
+    """
+    LRU acotado {features redondeadas → (índice, proba)}. Sin lock: con el
+    GIL cada operación del OrderedDict es atómica y una carrera solo puede
+    perder una inserción o un move_to_end (last-write-wins).
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[bytes, Tuple[int, Any]]" = OrderedDict()
+
+    @staticmethod
+    def key(X: np.ndarray) -> bytes:
+        return np.round(X, PREDICT_CACHE_DECIMALS).tobytes()
+
+    def get(self, key: bytes):
+        hit = self._data.get(key)
+        if hit is not None:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                pass  # desalojada por otro hilo entre get y move_to_end
+        return hit
+
+    def put(self, key: bytes, value: Tuple[int, Any]):
+        self._data[key] = value
+        while len(self._data) > self.max_size:
+            try:
+                self._data.popitem(last=False)
+            except KeyError:
+                break
+
+# ======== Micro-batching ========
+class MicroBatcher:
+    """
+    Agrupa peticiones concurrentes en una sola llamada a predict_proba.
+    Cada petición encola (X, Event, holder) y espera a que el hilo worker
+    deje en holder su porción del resultado: {"pred": [...], "proba": [...]}.
+    max_size limita las filas por llamada (no las peticiones): una petición
+    con más filas que max_size va sola.
+    """
+    def __init__(self, model, max_size: int, timeout_ms: float):
+        self.model = model
+        self.max_size = max(1, max_size)
+        self.timeout = timeout_ms / 1000.0
+        self.queue: Optional[queue.Queue] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        # Los hilos no sobreviven a un fork (gunicorn --preload): se relanza
+        # el worker la primera vez que se usa en cada proceso.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            q = queue.Queue()
+            threading.Thread(target=self._run, args=(q,), name="predict-batcher", daemon=True).start()
+            self.queue = q
+            self._pid = os.getpid()
+
+    def submit(self, X: np.ndarray, timeout: float):
+        self.start()
+        done = threading.Event()
+        holder: dict = {}
+        self.queue.put((X, done, holder))
+        if not done.wait(timeout):
+            raise TimeoutError("Timeout esperando resultado del batch de predicción")
+        if "error" in holder:
+            raise holder["error"]
+        return holder["pred"], holder["proba"]
+
+    def _run(self, q: queue.Queue):
+        pending = None  # petición que no cupo en el batch anterior
+        while True:
+            items = [pending if pending is not None else q.get()]
+            pending = None
+            rows = items[0][0].shape[0]
+            deadline = time.monotonic() + self.timeout
+            while rows < self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if rows + item[0].shape[0] > self.max_size:
+                    pending = item
+                    break
+                items.append(item)
+                rows += item[0].shape[0]
+            self._process(items)
+
+    def _process(self, items):
+        try:
+            X = np.vstack([x for x, _, _ in items])
+            BATCH_SIZE_HIST.observe(X.shape[0])
+            pred, proba = predict_rows(self.model, X)
+            start = 0
+            for x, _, holder in items:
+                end = start + x.shape[0]
+                holder["pred"], holder["proba"] = pred[start:end], proba[start:end]
+                start = end
+        except Exception as e:
+            for _, _, holder in items:
+                holder["error"] = e
+        finally:
+            for _, done, _ in items:
+                done.set()
+
+# ======== Respuestas JSON (orjson) ========
+def _json_response(obj, status: int = 200) -> Response:
+    # OPT_SERIALIZE_NUMPY permite devolver arrays (p.ej. proba) sin .tolist()
+    return Response(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+                    status=status, mimetype="application/json")
+
 # ======== Logging JSON con request_id ========
 class JsonFormatter(logging.Formatter):
     def format(self, record):
@@ -106,84 +674,182 @@ def create_app() -> Flask:
     app.model = None
     app.meta = {}
     app.load_error: Optional[str] = None
+    serving: dict = {}
     try:
-        app.model, app.meta = load_artifact(ARTIFACT_PATH)
+        app.model, app.meta, serving = load_artifact_cached(ARTIFACT_PATH)
         app.logger.info(f"Modelo cargado desde: {ARTIFACT_PATH}")
     except Exception as e:
         app.load_error = str(e)
         app.logger.error(f"Error cargando modelo: {app.load_error}")
 
+    # Kernels AOT del fast path: se cargan antes de envolver el modelo para
+    # que el escalado del modelo completo (referencia) tampoco use el JIT
+    kernels = None
+    if FAST_PATH and DistilledModel.supports(serving):
+        kernels = load_aot_kernels(os.path.dirname(os.path.abspath(ARTIFACT_PATH)))
+    aot_scale = getattr(kernels, "scale_rows", None)
+
+    # Escalado fuera del pipeline (kernel AOT, Numba o NumPy)
+    if ScaledModel.supports(app.model):
+        app.model = ScaledModel(app.model)
+    if hasattr(app.model, "scale_fn"):
+        if aot_scale is not None:
+            app.model.scale_fn = aot_scale
+        scaler_name = "AOT bc_kernels" if aot_scale is not None else ("Numba" if njit is not None else "NumPy")
+        app.logger.info(f"Escalado con {scaler_name}")
+
+    # Fast path: LR destilada, con el modelo completo como referencia
+    if FAST_PATH and app.model is not None:
+        if DistilledModel.supports(serving):
+            app.model = DistilledModel(serving, app.model, FAST_PATH_AUDIT_RATE, kernels)
+            kernel_name = "AOT bc_kernels" if kernels is not None else ("Numba" if njit is not None else "NumPy")
+            app.logger.info(f"Fast path activo (LR destilada con {kernel_name}, auditoría {FAST_PATH_AUDIT_RATE:.0%})")
+        else:
+            app.logger.warning("FAST_PATH=1 pero el artefacto no trae lr_coef/scaler (serving): se usa el modelo completo")
+
+    app.predict_cache = PredictionCache(PREDICT_CACHE_SIZE) if PREDICT_CACHE_SIZE > 0 else None
+
+    # Warmup: el primer predict paga inicializaciones perezosas (JIT, etc.)
+    if WARMUP and app.model is not None:
+        t0 = time.perf_counter()
+        try:
+            warmup_model(app.model, n_features_expected(app.meta))
+            app.logger.info(f"Warmup del modelo en {(time.perf_counter() - t0) * 1000:.1f} ms")
+        except Exception as e:
+            app.logger.warning(f"Warmup fallido: {e}")
+
+    # Micro-batching solo si el modelo expone predict_proba
+    app.batcher = None
+    if BATCHING and hasattr(app.model, "predict_proba"):
+        app.batcher = MicroBatcher(app.model, BATCH_SIZE, BATCH_TIMEOUT_MS)
+        app.batcher.start()
+        app.logger.info(f"Micro-batching activo: size={BATCH_SIZE}, timeout_ms={BATCH_TIMEOUT_MS}")
+
     # ====== middleware: request_id + métricas ======
+    # /metrics se excluye: Prometheus lo consulta con frecuencia y no
+    # necesita request_id ni contar en las métricas de la API.
     @app.before_request
     def before():
+        if request.endpoint == "metrics":
+            return
         g.t0 = time.time()
-        g.request_id = request.headers.get("X-Request-Id", str(uuid.uuid4()))
+        # Solo se genera un id si el cliente no envía X-Request-Id
+        g.request_id = request.headers.get("X-Request-Id") or secrets.token_hex(8)
 
     @app.after_request
     def after(resp):
         endpoint = request.endpoint or "unknown"
-        method = request.method
+        if endpoint == "metrics":
+            return resp
         # Importante: labels de Prometheus son strings
-        REQ_COUNT.labels(endpoint, method, str(resp.status_code)).inc()
-        REQ_LATENCY.labels(endpoint, method).observe(time.time() - g.get("t0", time.time()))
+        cache_hit = "true" if g.get("cache_hit", False) else "false"
+        count, latency = _metric_children(endpoint, request.method, str(resp.status_code), cache_hit)
+        count.inc()
+        latency.observe(time.time() - g.get("t0", time.time()))
         resp.headers["X-Request-Id"] = g.request_id
         return resp
 
+    # / y /health solo dependen de meta/load_error, fijos tras la carga:
+    # se serializan una vez aquí y cada request devuelve los mismos bytes.
+    ok = (app.model is not None) and (app.load_error is None)
+    root_body = orjson.dumps({
+        "status": "success",
+        "message": "API ML Evaluación Modular",
+        "model_path": ARTIFACT_PATH,
+        "meta": app.meta,
+        "load_error": app.load_error
+    }, option=orjson.OPT_SERIALIZE_NUMPY)
+    health_body = orjson.dumps({
+        "status": "ok" if ok else "error",
+        "model_loaded": ok,
+        "n_features": n_features_expected(app.meta),
+        "batch": True,  # /predict acepta features_batch
+        "meta": app.meta,
+        "error": app.load_error
+    }, option=orjson.OPT_SERIALIZE_NUMPY)
+    health_status = 200 if ok else 500
+
     # -------- Endpoints --------
     @app.get("/")
     def root():
-        return jsonify({
-            "status": "success",
-            "message": "API ML Evaluación Modular",
-            "model_path": ARTIFACT_PATH,
-            "meta": app.meta,
-            "load_error": app.load_error
-        })
+        return Response(root_body, mimetype="application/json")
 
     @app.get("/health")
     def health():
-        ok = (app.model is not None) and (app.load_error is None)
-        return jsonify({
-            "status": "ok" if ok else "error",
-            "model_loaded": ok,
-            "n_features": n_features_expected(app.meta),
-            "meta": app.meta,
-            "error": app.load_error
-        }), (200 if ok else 500)
+        return Response(health_body, status=health_status, mimetype="application/json")
+
+    def class_name(pred_idx: int):
+        class_names = app.meta.get("class_names")
+        return class_names[pred_idx] if class_names else pred_idx
+
+    def predict_batch(data: dict) -> Response:
+        # Sin caché: las filas van juntas al modelo (o al micro-batcher)
+        X = _validate_batch(data)
+        if app.batcher is not None:
+            preds, probas = app.batcher.submit(X, BATCH_SLO_MS / 1000.0)
+        else:
+            preds, probas = predict_rows(app.model, X)
+        results = [{
+            "prediction_index": int(p),
+            "prediction": class_name(int(p)),
+            "proba": probas[i] if probas is not None else None
+        } for i, p in enumerate(preds)]
+        app.logger.info(f"Predicción batch OK: filas={len(results)}")
+        return _json_response({
+            "status": "success",
+            "predictions": results,
+            "request_id": g.request_id
+        })
 
     @app.post("/predict")
     def predict():
         if app.model is None:
-            return jsonify({
+            return _json_response({
                 "status": "error",
                 "message": "Modelo no cargado",
                 "error": app.load_error
-            }), 500
+            }, 500)
         try:
-            data = request.get_json(force=True, silent=False)
-            payload = PredictInput(**data)
-            X = np.array(payload.features, dtype=float).reshape(1, -1)
+            data = orjson.loads(request.get_data() or b"{}")
+            if isinstance(data, dict) and "features_batch" in data:
+                return predict_batch(data)
+            X = _validate(data)
 
-            proba = app.model.predict_proba(X)[0].tolist() if hasattr(app.model, "predict_proba") else None
-            pred_idx = int(app.model.predict(X)[0])
+            cache = app.predict_cache
+            key = cache.key(X) if cache is not None else None
+            hit = cache.get(key) if cache is not None else None
+            if hit is not None:
+                g.cache_hit = True
+                pred_idx, proba = hit
+            else:
+                if app.batcher is not None:
+                    preds, probas = app.batcher.submit(X, BATCH_SLO_MS / 1000.0)
+                else:
+                    preds, probas = predict_rows(app.model, X)
+                pred_idx = int(preds[0])
+                proba = probas[0].copy() if probas is not None else None
+                if cache is not None:
+                    cache.put(key, (pred_idx, proba))
 
-            class_names = app.meta.get("class_names")
-            pred_name = (class_names[pred_idx] if class_names else pred_idx)
+            pred_name = class_name(pred_idx)
 
             app.logger.info(f"Predicción OK: idx={pred_idx}, name={pred_name}")
-            return jsonify({
+            return _json_response({
                 "status": "success",
                 "prediction_index": pred_idx,
                 "prediction": pred_name,
                 "proba": proba,
                 "request_id": g.request_id
             })
-        except ValidationError as ve:
+        except orjson.JSONDecodeError as je:
+            app.logger.warning(f"JSON inválido: {je}")
+            return _json_response({"status":"error","message":"JSON inválido","details": str(je)}, 400)
+        except (ValidationError, BadPayload) as ve:
             app.logger.warning(f"Payload inválido: {ve.errors()}")
-            return jsonify({"status":"error","message":"Payload inválido","details": ve.errors()}), 400
+            return _json_response({"status":"error","message":"Payload inválido","details": ve.errors()}, 400)
         except Exception as e:
             app.logger.exception("Error en /predict")
-            return jsonify({"status":"error","message":str(e)}), 500
+            return _json_response({"status":"error","message":str(e)}, 500)
 
     @app.get("/metrics")
     def metrics():
@@ -191,8 +857,13 @@ def create_app() -> Flask:
 
     return app
 
-# Ejecutable directamente (dev)
-# Permite: python src/app.py
+# Ejecutable directamente solo en desarrollo
+# Permite: FLASK_ENV=development python src/app.py
 if __name__ == "__main__":
+    if os.getenv("FLASK_ENV") != "development":
+        raise SystemExit(
+            "El servidor de desarrollo requiere FLASK_ENV=development. "
+            "En producción usa: gunicorn -c gunicorn_conf.py 'src.app:create_app()'"
+        )
     app = create_app()
     app.run(host="0.0.0.0", port=APP_PORT)
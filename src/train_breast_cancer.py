@@ -5,37 +5,189 @@
 # Descripción:
 #   Entrena un clasificador RandomForest sobre el dataset Breast Cancer Wisconsin,
 #   normaliza las features con StandardScaler y guarda el artefacto como joblib.
+#   El número de árboles se elige por validación cruzada: el menor de
+#   N_ESTIMATORS_GRID (con max_depth=MAX_DEPTH) cuya exactitud CV queda a
+#   menos de CV_TOLERANCE del RF de referencia (200 árboles, sin límite).
 #
-# Artefacto:
-#   src/model/modelo_breast.pkl (dict con {"model": pipeline, "meta": {...}})
+# Artefactos:
+#   src/model/modelo_breast.pkl  (dict con {"model": pipeline, "meta": {...},
+#                                 "serving": {...}})
+#   src/model/modelo_breast.onnx (pipeline exportado con skl2onnx; opcional,
+#                                 solo si skl2onnx está instalado)
+#   src/model/modelo_breast.so   (RF compilado a código nativo con Treelite +
+#   src/model/modelo_breast.meta.json  TL2cgen; opcional, con EXPORT_TREELITE=1)
+#   src/model/bc_kernels.*.so    (kernel AOT del fast path con numba.pycc;
+#                                 opcional, con EXPORT_AOT=1)
 #
 # Meta-información guardada:
 #   - n_features: número de características
 #   - class_names: nombres de las clases
 #   - test_accuracy: exactitud en test
+#   - n_estimators / max_depth: tamaño del RF elegido
+#   - cv_accuracy / cv_baseline_accuracy: exactitud CV del RF elegido y del de referencia
 #   - dataset: nombre del dataset
+#   - lr_test_agreement: fracción de test donde la LR destilada coincide con el RF
+#
+# Parámetros de serving (clave "serving", fuera de meta: / y /health no los
+# exponen):
+#   - scaler_mean / scaler_scale: parámetros del StandardScaler (para las rutas
+#     que escalan fuera del pipeline, p.ej. Treelite)
+#   - lr_coef / lr_intercept: LogisticRegression destilada del RF (sobre las
+#     features escaladas), usada por la API con FAST_PATH=1
 #
 # Uso local:
 #   python src/train_breast_cancer.py
+#   EXPORT_TREELITE=1 python src/train_breast_cancer.py   # + librería nativa (gcc)
+#   EXPORT_AOT=1 python src/train_breast_cancer.py   # + kernel AOT (numba.pycc)
 #
 # Uso con Makefile:
 #   make train
 # ============================================================================
 
 from __future__ import annotations
-import os, json, joblib
+import os, json, math, joblib
 from pathlib import Path
+import numpy as np
 from sklearn.datasets import load_breast_cancer
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score
 
+# skl2onnx es opcional: sin él solo se genera el .pkl
+try:
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+except Exception:  # pragma: no cover
+    convert_sklearn = None
+
+# treelite + tl2cgen son opcionales: compilan el RF a una librería nativa
+try:
+    import treelite, tl2cgen
+except Exception:  # pragma: no cover
+    treelite = tl2cgen = None
+
+# numba.pycc es opcional: compila el kernel del fast path por adelantado
+try:
+    from numba.pycc import CC
+except Exception:  # pragma: no cover
+    CC = None
+
 # -------- Configuración --------
 # Ruta del artefacto (configurable por env, por defecto: src/model/modelo_breast.pkl)
 DEFAULT_PATH = Path(__file__).resolve().parent / "model" / "modelo_breast.pkl"
 MODEL_PATH = Path(os.getenv("MODEL_PATH", str(DEFAULT_PATH)))
+ONNX_PATH = MODEL_PATH.with_suffix(".onnx")
+
+# Tamaño del RF: menos árboles y profundidad acotada = menos trabajo por predict
+N_ESTIMATORS_GRID = (25, 50, 100, 200)
+MAX_DEPTH = 8
+CV_FOLDS = 5
+CV_TOLERANCE = 0.005
+TREELITE_PATH = MODEL_PATH.with_suffix(".so")
+EXPORT_TREELITE = os.getenv("EXPORT_TREELITE", "0") == "1"
+EXPORT_AOT = os.getenv("EXPORT_AOT", "0") == "1"
+
+def make_pipeline(n_estimators: int, max_depth: int | None) -> Pipeline:
+    # n_jobs es una decisión de serving: la API lo fuerza a 1 al cargar el
+    # artefacto (predecir 1 fila en paralelo solo añade overhead).
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("rf", RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                      n_jobs=1, random_state=42))
+    ])
+
+def select_n_estimators(Xtr: np.ndarray, ytr: np.ndarray) -> tuple[int, float, float]:
+    """
+    Devuelve (n_estimators, cv_accuracy, cv_baseline_accuracy): el menor n de
+    N_ESTIMATORS_GRID con max_depth=MAX_DEPTH cuya exactitud CV media está a
+    menos de CV_TOLERANCE del RF de 200 árboles sin límite de profundidad.
+    """
+    baseline = cross_val_score(make_pipeline(200, None), Xtr, ytr, cv=CV_FOLDS).mean()
+    for n in N_ESTIMATORS_GRID:
+        score = cross_val_score(make_pipeline(n, MAX_DEPTH), Xtr, ytr, cv=CV_FOLDS).mean()
+        if score >= baseline - CV_TOLERANCE:
+            return n, float(score), float(baseline)
+    return N_ESTIMATORS_GRID[-1], float(score), float(baseline)
+
+def distill_logreg(pipe: Pipeline, Xtr: np.ndarray) -> LogisticRegression:
+    """
+    Ajusta una LogisticRegression a las predicciones del RF (no a y) sobre
+    las features escaladas: imita al RF con un solo producto punto.
+    """
+    Xtr_scaled = pipe.named_steps["scaler"].transform(Xtr)
+    rf_labels = pipe.named_steps["rf"].predict_proba(Xtr_scaled)[:, 1] > 0.5
+    return LogisticRegression(max_iter=1000).fit(Xtr_scaled, rf_labels)
+
+def export_onnx(pipe: Pipeline, meta: dict, serving: dict, path: Path) -> bool:
+    """
+    Exporta el pipeline (scaler + RF) a ONNX para servirlo con onnxruntime.
+    La meta, los parámetros de serving y las clases viajan en metadata_props
+    del propio .onnx.
+    """
+    if convert_sklearn is None:
+        return False
+    onx = convert_sklearn(
+        pipe,
+        initial_types=[("input", FloatTensorType([None, meta["n_features"]]))],
+        options={id(pipe.named_steps["rf"]): {"zipmap": False}},
+    )
+    for key, value in (("meta", meta), ("serving", serving), ("classes", pipe.classes_.tolist())):
+        prop = onx.metadata_props.add()
+        prop.key, prop.value = key, json.dumps(value, ensure_ascii=False)
+    path.write_bytes(onx.SerializeToString())
+    return True
+
+def export_aot_kernels(out_dir: Path) -> bool:
+    """
+    Compila con numba.pycc el módulo bc_kernels (escalado + LR destilada) en
+    out_dir, junto al .pkl: la API lo importa sin pagar JIT al arrancar.
+    score_rows devuelve la probabilidad de la clase 1 para cada fila de X;
+    scale_rows es el escalado de app.scale_rows, para el modelo completo.
+    """
+    if CC is None:
+        return False
+    cc = CC("bc_kernels")
+    cc.output_dir = str(out_dir)
+
+    @cc.export("score_rows", "f8[:](f8[:, :], f8[:], f8[:], f4[:], f4)")
+    def score_rows(X, mean, scale, coef, intercept):
+        n, d = X.shape
+        out = np.empty(n, dtype=np.float64)
+        for r in range(n):
+            z = 0.0
+            for i in range(d):
+                z += (X[r, i] - mean[i]) / scale[i] * coef[i]
+            out[r] = 1.0 / (1.0 + math.exp(-(z + intercept)))
+        return out
+
+    @cc.export("scale_rows", "f4[:, :](f8[:, :], f8[:], f8[:])")
+    def scale_rows(X, mean, scale):
+        n, d = X.shape
+        out = np.empty((n, d), dtype=np.float32)
+        for r in range(n):
+            for i in range(d):
+                out[r, i] = (X[r, i] - mean[i]) / scale[i]
+        return out
+
+    cc.compile()
+    return True
+
+def export_treelite(pipe: Pipeline, meta: dict, serving: dict, path: Path) -> bool:
+    """
+    Compila solo el RF a una librería nativa (Treelite + TL2cgen, gcc). El
+    escalado se hace en la API con scaler_mean/scaler_scale de serving, que
+    junto con la meta se guardan en <modelo>.meta.json.
+    """
+    if treelite is None or tl2cgen is None:
+        return False
+    tl_model = treelite.sklearn.import_model(pipe.named_steps["rf"])
+    tl2cgen.export_lib(tl_model, toolchain="gcc", libpath=str(path), params={"parallel_comp": 4})
+    sidecar = {"meta": meta, "serving": serving, "classes": pipe.classes_.tolist()}
+    path.with_suffix(".meta.json").write_text(json.dumps(sidecar, ensure_ascii=False), encoding="utf-8")
+    return True
 
 def main():
     data = load_breast_cancer()
@@ -46,33 +198,58 @@ def main():
         X, y, test_size=0.2, random_state=42, stratify=y
     )
 
-    # Pipeline: escalado + RandomForest
-    pipe = Pipeline([
-        ("scaler", StandardScaler()),
-        ("rf", RandomForestClassifier(n_estimators=200, random_state=42))
-    ])
+    # Pipeline: escalado + RandomForest (tamaño elegido por CV)
+    n_estimators, cv_acc, cv_baseline = select_n_estimators(Xtr, ytr)
+    pipe = make_pipeline(n_estimators, MAX_DEPTH)
     pipe.fit(Xtr, ytr)
 
     # Evaluación rápida
     acc = accuracy_score(yte, pipe.predict(Xte))
 
+    # Modelo destilado (fast path de la API)
+    lr = distill_logreg(pipe, Xtr)
+    rf_te = pipe.predict_proba(Xte)[:, 1] > 0.5
+    lr_agreement = float((lr.predict(pipe.named_steps["scaler"].transform(Xte)) == rf_te).mean())
+
     # Meta-información
     meta = {
         "status": "ok",
         "n_features": X.shape[1],
         "class_names": list(data.target_names),
         "test_accuracy": round(float(acc), 4),
-        "dataset": "breast_cancer_wisconsin"
+        "n_estimators": n_estimators,
+        "max_depth": MAX_DEPTH,
+        "cv_accuracy": round(cv_acc, 4),
+        "cv_baseline_accuracy": round(cv_baseline, 4),
+        "dataset": "breast_cancer_wisconsin",
+        "lr_test_agreement": round(lr_agreement, 4)
+    }
+
+    # Parámetros para las rutas que no usan el pipeline sklearn (no son meta)
+    serving = {
+        "scaler_mean": pipe.named_steps["scaler"].mean_.tolist(),
+        "scaler_scale": pipe.named_steps["scaler"].scale_.tolist(),
+        "lr_coef": lr.coef_[0].astype(np.float32).tolist(),
+        "lr_intercept": float(lr.intercept_[0])
     }
 
     # Crear carpeta destino si no existe
     MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
 
     # Guardar artefacto
-    joblib.dump({"model": pipe, "meta": meta}, MODEL_PATH)
+    joblib.dump({"model": pipe, "meta": meta, "serving": serving}, MODEL_PATH)
+    onnx_saved = export_onnx(pipe, meta, serving, ONNX_PATH)
+    treelite_saved = EXPORT_TREELITE and export_treelite(pipe, meta, serving, TREELITE_PATH)
+    aot_saved = EXPORT_AOT and export_aot_kernels(MODEL_PATH.parent)
 
     # Log en JSON
-    print(json.dumps({"saved": str(MODEL_PATH), **meta}, ensure_ascii=False, indent=2))
+    print(json.dumps({
+        "saved": str(MODEL_PATH),
+        "saved_onnx": str(ONNX_PATH) if onnx_saved else None,
+        "saved_treelite": str(TREELITE_PATH) if treelite_saved else None,
+        "saved_aot_kernels": str(MODEL_PATH.parent / "bc_kernels.*.so") if aot_saved else None,
+        **meta
+    }, ensure_ascii=False, indent=2))
 
 if __name__ == "__main__":
     main()
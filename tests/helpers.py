@@ -0,0 +1,34 @@
+# ============================================================================
+# helpers.py — Utilidades comunes de los tests que no levantan la API
+# Descripción:
+#   Importa src.app con el modelo de src/model/ (o el de MODEL_PATH) y
+#   permite cambiar temporalmente sus constantes de configuración.
+# ============================================================================
+
+from __future__ import annotations
+import os, sys
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("MODEL_PATH", str(ROOT / "src" / "model" / "modelo_breast.pkl"))
+
+import src.app as api  # noqa: E402
+
+
+@contextmanager
+def override(**values):
+    """
+    Cambia constantes de src.app (p.ej. BATCHING=True) y las restaura al
+    salir, aunque el test falle: create_app() y los validadores las leen en
+    cada llamada.
+    """
+    old = {name: getattr(api, name) for name in values}
+    for name, value in values.items():
+        setattr(api, name, value)
+    try:
+        yield
+    finally:
+        for name, value in old.items():
+            setattr(api, name, value)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# ============================================================================
+# test_batching.py — Micro-batching de /predict (BATCHING=1)
+# Descripción:
+#   Peticiones concurrentes a /predict con el MicroBatcher activo deben dar
+#   la misma predicción que el pipeline sklearn; un error o un timeout del
+#   modelo devuelve 500 sin tumbar el hilo del batcher; y ninguna llamada
+#   al modelo recibe más de BATCH_SIZE filas (salvo una petición más grande).
+#   No necesita la API levantada: usa el test client de Flask.
+#
+# Uso local:
+#   python tests/test_batching.py
+# ============================================================================
+
+from __future__ import annotations
+import time, threading
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+from sklearn.datasets import load_breast_cancer
+from helpers import api, override
+
+X_DATA = load_breast_cancer().data
+
+
+class StubModel:
+    """Modelo de prueba: registra las filas de cada llamada y puede fallar o tardar."""
+    classes_ = np.array([0, 1])
+
+    def __init__(self, error: Exception = None, delay: float = 0.0):
+        self.error, self.delay = error, delay
+        self.calls = []
+
+    def predict_proba(self, X):
+        self.calls.append(X.shape[0])
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return np.tile([0.25, 0.75], (X.shape[0], 1))
+
+
+def batching_app():
+    with override(BATCHING=True, BATCH_TIMEOUT_MS=5):
+        app = api.create_app()
+    assert app.batcher is not None
+    return app
+
+
+def post_row(app, row) -> tuple:
+    r = app.test_client().post("/predict", json={"features": [float(v) for v in row]})
+    return r.status_code, r.get_json()
+
+
+def test_concurrent_predict_matches_pipeline():
+    app = batching_app()
+    pipe = joblib.load(api.ARTIFACT_PATH)["model"]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        responses = list(pool.map(lambda row: post_row(app, row), X_DATA))
+    assert all(status == 200 for status, _ in responses), [r for r in responses if r[0] != 200][:1]
+    got = np.array([body["prediction_index"] for _, body in responses])
+    assert np.array_equal(got, pipe.predict(X_DATA))
+
+
+def test_model_error_returns_500():
+    app = batching_app()
+    model = app.batcher.model
+    app.batcher.model = StubModel(error=ValueError("modelo roto"))
+    try:
+        status, body = post_row(app, X_DATA[0] * 1.01)
+    finally:
+        app.batcher.model = model
+    assert status == 500 and "modelo roto" in body["message"], body
+    # El hilo del batcher sigue vivo tras el error
+    assert post_row(app, X_DATA[1] * 1.01)[0] == 200
+
+
+def test_timeout_returns_500():
+    app = batching_app()
+    model = app.batcher.model
+    app.batcher.model = StubModel(delay=0.5)
+    try:
+        with override(BATCH_SLO_MS=50):
+            status, body = post_row(app, X_DATA[2] * 1.01)
+    finally:
+        time.sleep(0.5)  # deja terminar la llamada lenta antes de restaurar
+        app.batcher.model = model
+    assert status == 500 and "Timeout" in body["message"], body
+    assert post_row(app, X_DATA[3] * 1.01)[0] == 200
+
+
+def test_batch_rows_capped():
+    stub = StubModel()
+    batcher = api.MicroBatcher(stub, max_size=4, timeout_ms=50)
+    sizes = [1, 3, 2, 1, 6, 2, 1]  # 6 > max_size: va sola
+    results = {}
+
+    def submit(i, n):
+        results[i] = batcher.submit(np.zeros((n, X_DATA.shape[1])), timeout=5)
+
+    threads = [threading.Thread(target=submit, args=(i, n)) for i, n in enumerate(sizes)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(stub.calls) == sum(sizes), stub.calls
+    assert all(n <= 4 or n == 6 for n in stub.calls), stub.calls
+    assert all(len(results[i][0]) == n for i, n in enumerate(sizes))
+
+
+def main():
+    tests = [test_concurrent_predict_matches_pipeline, test_model_error_returns_500,
+             test_timeout_returns_500, test_batch_rows_capped]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ Micro-batching correcto.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# ============================================================================
+# test_cache.py — Caché LRU de predicciones de /predict
+# Descripción:
+#   PredictionCache desaloja la entrada menos usada al superar
+#   PREDICT_CACHE_SIZE, y /predict cuenta cada request en api_requests_total
+#   con cache_hit="true" solo cuando la respuesta sale de la caché.
+#   No necesita la API levantada: usa el test client de Flask.
+#
+# Uso local:
+#   python tests/test_cache.py
+# ============================================================================
+
+from __future__ import annotations
+
+import numpy as np
+from prometheus_client import REGISTRY
+from sklearn.datasets import load_breast_cancer
+from helpers import api, override
+
+X_DATA = load_breast_cancer().data
+
+
+def predict_count(cache_hit: str) -> float:
+    labels = {"endpoint": "predict", "method": "POST", "status": "200", "cache_hit": cache_hit}
+    return REGISTRY.get_sample_value("api_requests_total", labels) or 0.0
+
+
+def test_lru_eviction():
+    cache = api.PredictionCache(2)
+    a, b, c = (api.PredictionCache.key(X_DATA[i:i + 1]) for i in range(3))
+    cache.put(a, (0, None))
+    cache.put(b, (1, None))
+    assert cache.get(a) == (0, None)  # a pasa a ser la más reciente
+    cache.put(c, (1, None))           # desaloja b, la menos usada
+    assert cache.get(b) is None
+    assert cache.get(a) is not None and cache.get(c) is not None
+    assert len(cache._data) == 2
+
+
+def test_cache_hit_label():
+    with override(PREDICT_CACHE_SIZE=2):
+        app = api.create_app()
+    client = app.test_client()
+    rows = {name: [float(v) for v in X_DATA[i] * 1.02] for i, name in enumerate("abc")}
+    hits0, misses0 = predict_count("true"), predict_count("false")
+
+    bodies = {}
+    for name in ["a", "b", "a", "c", "b", "a"]:
+        r = client.post("/predict", json={"features": rows[name]})
+        assert r.status_code == 200, r.get_json()
+        body = r.get_json()
+        if name in bodies:
+            assert body["prediction_index"] == bodies[name]["prediction_index"], name
+            assert np.allclose(body["proba"], bodies[name]["proba"]), name
+        bodies[name] = body
+
+    # a, b: miss | a: hit | c: miss (desaloja b) | b: miss (desaloja a) | a: miss
+    assert predict_count("true") - hits0 == 1
+    assert predict_count("false") - misses0 == 5
+    assert len(app.predict_cache._data) == 2
+
+
+def main():
+    tests = [test_lru_eviction, test_cache_hit_label]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ Caché de predicciones correcta.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# ============================================================================
+# test_fast_path.py — Fast path (FAST_PATH=1) y su auditoría
+# Descripción:
+#   El warmup de create_app() no envía su fila de ceros a la auditoría: no
+#   arranca el hilo fast-path-audit ni cuenta en api_fast_path_audit_total.
+#   Las filas reales sí se auditan contra el modelo completo.
+#   No necesita la API levantada: usa el test client de Flask.
+#
+# Uso local:
+#   python tests/test_fast_path.py
+# ============================================================================
+
+from __future__ import annotations
+import time
+
+from prometheus_client import REGISTRY
+from sklearn.datasets import load_breast_cancer
+from helpers import api, override
+
+X_DATA = load_breast_cancer().data
+
+
+def audited_rows() -> float:
+    return sum(REGISTRY.get_sample_value("api_fast_path_audit_total", {"agree": agree}) or 0.0
+               for agree in ("true", "false"))
+
+
+def test_warmup_skips_audit():
+    before = audited_rows()
+    with override(FAST_PATH=True, FAST_PATH_AUDIT_RATE=1.0, WARMUP=True):
+        app = api.create_app()
+    assert isinstance(app.model, api.DistilledModel)
+    assert app.model._audit_q is None, "el warmup llegó a la cola de auditoría"
+    assert audited_rows() == before
+
+    # Una fila real sí se audita (audit_rate = 100%)
+    r = app.test_client().post("/predict", json={"features": [float(v) for v in X_DATA[0] * 1.03]})
+    assert r.status_code == 200, r.get_json()
+    deadline = time.monotonic() + 5
+    while audited_rows() < before + 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert audited_rows() == before + 1
+
+
+def main():
+    tests = [test_warmup_skips_audit]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ Fast path correcto.")
+
+
+if __name__ == "__main__":
+    main()
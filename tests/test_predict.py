@@ -4,9 +4,11 @@
 # Autor: John Gómez
 # Fecha: 2025-09-25
 # Descripción:
-#   Script de prueba que consulta /health y luego recorre todos los JSON
-#   ubicados en tests/data/sample*.json, enviando cada uno a /predict.
-#   Compatible con requests (si está instalado) o urllib por defecto.
+#   Script de prueba que consulta /health y luego envía todos los JSON
+#   ubicados en tests/data/sample*.json a /predict: en un solo POST con
+#   features_batch si la API anuncia "batch": true en /health, o uno por uno.
+#   Compatible con requests (si está instalado, con una Session que reutiliza
+#   la conexión) o urllib por defecto.
 #
 # Uso local:
 #   python tests/test_predict.py
@@ -29,9 +31,18 @@ except Exception:  # pragma: no cover
     requests = None
 
 
-def http_get(url: str) -> dict:
-    if requests is not None:
-        r = requests.get(url, timeout=10)
+def make_session():
+    # Una sola Session: reutiliza la conexión TCP (keep-alive) entre requests
+    if requests is None:
+        return None
+    session = requests.Session()
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+
+def http_get(url: str, session=None) -> dict:
+    if session is not None:
+        r = session.get(url, timeout=10)
         r.raise_for_status()
         return r.json()
     import urllib.request as ur
@@ -39,9 +50,9 @@ def http_get(url: str) -> dict:
         return json.loads(resp.read().decode("utf-8"))
 
 
-def http_post(url: str, payload: dict) -> dict:
-    if requests is not None:
-        r = requests.post(url, json=payload, timeout=15)
+def http_post(url: str, payload: dict, session=None) -> dict:
+    if session is not None:
+        r = session.post(url, json=payload, timeout=15)
         r.raise_for_status()
         return r.json()
     import urllib.request as ur, urllib.error as ue
@@ -64,10 +75,11 @@ def main():
     )
     args = ap.parse_args()
     base = args.base_url.rstrip("/")
+    session = make_session()
 
     # 1) /health
     print(f"→ Probando HEALTH: {base}/health")
-    h = http_get(f"{base}/health")
+    h = http_get(f"{base}/health", session)
     print(json.dumps(h, indent=2, ensure_ascii=False))
     if not h.get("model_loaded", False):
         print("[ADVERTENCIA] El modelo no está cargado.", file=sys.stderr)
@@ -79,11 +91,21 @@ def main():
         print(f"[ERROR] No se encontraron samples en {data_dir}", file=sys.stderr)
         sys.exit(2)
 
-    for p in samples:
-        print(f"\n→ Probando PREDICT con {p.name}")
-        payload = json.loads(p.read_text(encoding="utf-8"))
-        r = http_post(f"{base}/predict", payload)
+    payloads = [json.loads(p.read_text(encoding="utf-8")) for p in samples]
+    if h.get("batch", False):
+        names = ", ".join(p.name for p in samples)
+        print(f"\n→ Probando PREDICT (batch) con {names}")
+        batch = {"features_batch": [payload["features"] for payload in payloads]}
+        r = http_post(f"{base}/predict", batch, session)
         print(json.dumps(r, indent=2, ensure_ascii=False))
+        if len(r.get("predictions", [])) != len(samples):
+            print("[ERROR] El batch no devolvió una predicción por sample", file=sys.stderr)
+            sys.exit(1)
+    else:
+        for p, payload in zip(samples, payloads):
+            print(f"\n→ Probando PREDICT con {p.name}")
+            r = http_post(f"{base}/predict", payload, session)
+            print(json.dumps(r, indent=2, ensure_ascii=False))
 
     print("\n✓ Pruebas completadas correctamente.")
 
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# ============================================================================
+# test_validation.py — Validación manual vs. esquema Pydantic en /predict
+# Descripción:
+#   Comprueba que la validación manual (default) y STRICT_VALIDATION=1
+#   (PredictInput / PredictBatchInput de Pydantic) aceptan y rechazan los
+#   mismos payloads: mismo campo (y fila) en el error y mismo status HTTP
+#   (400) en /predict.
+#   No necesita la API levantada: usa el test client de Flask con el
+#   modelo de src/model/.
+#
+# Uso local:
+#   python tests/test_validation.py
+# ============================================================================
+
+from __future__ import annotations
+import json
+
+import numpy as np
+from pydantic import ValidationError
+from helpers import api, override
+
+ROW = [float(i + 1) for i in range(api.N_FEATURES)]
+
+# Payloads válidos: ambos modos los aceptan y producen el mismo X
+ACCEPTED = {
+    "floats": {"features": ROW},
+    "ints": {"features": [int(v) for v in ROW]},
+    "numeric_strings": {"features": [str(v) for v in ROW]},
+    "true_item": {"features": [True] + ROW[1:]},
+}
+
+# Payloads inválidos: ambos modos los rechazan con error en el mismo campo
+REJECTED = {
+    "too_short": {"features": ROW[:-1]},
+    "too_long": {"features": ROW + [1.0]},
+    "empty": {"features": []},
+    "null": {"features": None},
+    "null_item": {"features": [None] + ROW[1:]},
+    "nested_list": {"features": [ROW]},
+    "nested_item": {"features": [[1.0]] + ROW[1:]},
+    "non_numeric_string": {"features": ["abc"] + ROW[1:]},
+    "dict_item": {"features": [{}] + ROW[1:]},
+    "true": {"features": True},
+    "string": {"features": "1,2,3"},
+    "missing": {},
+    "list_body": [1],
+    "null_body": None,
+}
+
+# Lo mismo para {"features_batch": [[...], ...]}
+BATCH_ACCEPTED = {
+    "one_row": {"features_batch": [ROW]},
+    "two_rows": {"features_batch": [ROW, [str(v) for v in ROW]]},
+    "max_rows": {"features_batch": [ROW] * api.PREDICT_MAX_ROWS},
+}
+
+BATCH_REJECTED = {
+    "empty": {"features_batch": []},
+    "too_many_rows": {"features_batch": [ROW] * (api.PREDICT_MAX_ROWS + 1)},
+    "short_row": {"features_batch": [ROW, ROW[:-1]]},
+    "null": {"features_batch": None},
+    "null_row": {"features_batch": [ROW, None]},
+    "flat_list": {"features_batch": ROW},
+    "non_numeric_item": {"features_batch": [ROW, ["abc"] + ROW[1:]]},
+}
+
+
+def validate(validator, payload, strict: bool):
+    """Ejecuta el validador en el modo pedido; devuelve X o la excepción."""
+    with override(STRICT_VALIDATION=strict):
+        try:
+            return validator(payload).copy()
+        except (ValidationError, api.BadPayload) as e:
+            return e
+
+
+def check_accepted(validator, cases: dict):
+    for name, payload in cases.items():
+        manual, strict = validate(validator, payload, False), validate(validator, payload, True)
+        assert isinstance(manual, np.ndarray), f"{name}: manual rechaza {manual}"
+        assert isinstance(strict, np.ndarray), f"{name}: strict rechaza {strict}"
+        assert np.array_equal(manual, strict), name
+
+
+def check_rejected(validator, cases: dict, loc_depth: int):
+    # loc_depth: cuántos niveles de loc deben coincidir (campo, fila)
+    for name, payload in cases.items():
+        manual, strict = validate(validator, payload, False), validate(validator, payload, True)
+        assert not isinstance(manual, np.ndarray), f"{name}: manual acepta"
+        assert not isinstance(strict, np.ndarray), f"{name}: strict acepta"
+        loc_manual = tuple(manual.errors()[0]["loc"])[:loc_depth]
+        loc_strict = tuple(strict.errors()[0]["loc"])[:loc_depth]
+        assert loc_manual == loc_strict, f"{name}: loc {loc_manual} != {loc_strict}"
+
+
+def test_accepted_payloads_agree():
+    check_accepted(api._validate, ACCEPTED)
+    check_accepted(api._validate_batch, BATCH_ACCEPTED)
+
+
+def test_rejected_payloads_agree():
+    check_rejected(api._validate, REJECTED, 1)
+    check_rejected(api._validate_batch, BATCH_REJECTED, 2)
+
+
+def post(client, payload):
+    # El cuerpo se serializa siempre (también null), como lo enviaría un cliente
+    return client.post("/predict", data=json.dumps(payload), content_type="application/json")
+
+
+def test_predict_status_agrees():
+    client = api.create_app().test_client()
+    for strict in (False, True):
+        with override(STRICT_VALIDATION=strict):
+            for name, payload in [*REJECTED.items(), *BATCH_REJECTED.items()]:
+                r = post(client, payload)
+                assert r.status_code == 400, f"{name} (strict={strict}): {r.status_code} {r.get_json()}"
+            for name, payload in ACCEPTED.items():
+                r = post(client, payload)
+                assert r.status_code == 200, f"{name} (strict={strict}): {r.status_code} {r.get_json()}"
+            for name, payload in BATCH_ACCEPTED.items():
+                r = post(client, payload)
+                assert r.status_code == 200, f"{name} (strict={strict}): {r.status_code} {r.get_json()}"
+                assert len(r.get_json()["predictions"]) == len(payload["features_batch"]), name
+
+
+def main():
+    tests = [test_accepted_payloads_agree, test_rejected_payloads_agree, test_predict_status_agrees]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ Validación manual y estricta coinciden.")
+
+
+if __name__ == "__main__":
+    main()